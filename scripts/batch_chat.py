@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Run a JSONL batch of chat queries offline, without going through HTTP.
+
+Each input line is {"user_id": "...", "query": "..."} (optional "id").
+Results stream to stdout (or --output) as JSONL in completion order; the
+final line holds throughput and latency stats, which are also printed to
+stderr.  Run from the repo root with the server's virtualenv active:
+
+    python scripts/batch_chat.py queries.jsonl > results.jsonl
+    cat queries.jsonl | python scripts/batch_chat.py - --concurrency 16
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+
+import agentic_rag  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="JSONL file of queries, or - for stdin")
+    parser.add_argument("-o", "--output", help="Write results here instead of stdout")
+    parser.add_argument(
+        "--concurrency", type=int, default=agentic_rag.BATCH_CONCURRENCY
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        help="Max model calls per second for this run (0 = unlimited); "
+        "defaults to BATCH_RATE_LIMIT",
+    )
+    args = parser.parse_args()
+
+    if args.input == "-":
+        text = sys.stdin.read()
+    else:
+        text = Path(args.input).read_text(encoding="utf-8")
+
+    try:
+        items = agentic_rag.parse_batch(text)
+    except ValueError as exc:
+        sys.exit(f"❌ {exc}")
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in agentic_rag.run_batch(items, args.concurrency, args.rate_limit):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps(result["stats"], indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_todos latency with and without the server's todo cache.
+
+Needs a running MongoDB (MONGODB_URI from server/.env).  Seeds todos for a
+throwaway user, times uncached and cached reads, then writes behind the
+cache's back (as the SvelteKit routes do) and measures how long the cache
+takes to notice.  Start mongod with --replSet to exercise change streams;
+a standalone server exercises the polling fallback.  Run from the repo root
+with the server's virtualenv active:
+
+    python scripts/bench_todo_cache.py
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+# Importing the server only needs a key to build the client.
+os.environ.setdefault("GEMINI_API_KEY", "unused-for-offline-benchmark")
+
+import agentic_rag  # noqa: E402
+
+BENCH_USER = "bench-todo-cache"
+
+
+def time_calls(fn, repeat: int) -> list[float]:
+    """Call ``fn`` ``repeat`` times, returning per-call latency in ms."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def summary(samples: list[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return f"mean {statistics.fmean(ordered):8.3f} ms   p95 {p95:8.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--todos", type=int, default=50, help="Todos to seed")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=20, help="Outside writes")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=max(10.0, 5 * agentic_rag.TODO_CACHE_POLL_INTERVAL),
+        help="Seconds to wait for each outside write to reach the cache",
+    )
+    args = parser.parse_args()
+
+    collection = agentic_rag.todos_collection
+    collection.delete_many({"userId": BENCH_USER})
+    now = datetime.datetime.now(datetime.timezone.utc)
+    collection.insert_many(
+        [
+            {
+                "userId": BENCH_USER,
+                "title": f"Task {i}",
+                "completed": False,
+                "createdAt": (now + datetime.timedelta(seconds=i)).isoformat(),
+            }
+            for i in range(args.todos)
+        ]
+    )
+
+    cache = agentic_rag._TodoCache(
+        collection,
+        max_users=max(1, agentic_rag.TODO_CACHE_MAX_USERS),
+        poll_interval=agentic_rag.TODO_CACHE_POLL_INTERVAL,
+    )
+    try:
+        uncached = time_calls(
+            lambda: agentic_rag._load_todos(BENCH_USER), args.repeat
+        )
+        cache.get(BENCH_USER)
+        # Give the watcher a moment to open its stream before timing hits.
+        time.sleep(agentic_rag.TODO_CACHE_POLL_INTERVAL)
+        cache.get(BENCH_USER)
+        cached = time_calls(lambda: cache.get(BENCH_USER), args.repeat)
+
+        # Outside writes: how long until the cache serves the new todo?
+        coherence = []
+        timed_out = 0
+        for i in range(args.writes):
+            title = f"Outside write {i}"
+            t0 = time.perf_counter()
+            collection.insert_one(
+                {
+                    "userId": BENCH_USER,
+                    "title": title,
+                    "completed": False,
+                    "createdAt": datetime.datetime.now(
+                        datetime.timezone.utc
+                    ).isoformat(),
+                }
+            )
+            deadline = t0 + args.timeout
+            while title not in cache.get(BENCH_USER):
+                if time.perf_counter() > deadline:
+                    timed_out += 1
+                    break
+                time.sleep(0.005)
+            else:
+                coherence.append((time.perf_counter() - t0) * 1000)
+    finally:
+        collection.delete_many({"userId": BENCH_USER})
+
+    print(f"get_todos ({args.todos} todos, {args.repeat} calls)")
+    print(f"  without cache   {summary(uncached)}")
+    print(f"  with cache      {summary(cached)}")
+    speedup = statistics.fmean(uncached) / statistics.fmean(cached)
+    print(f"  speedup         {speedup:.1f}x")
+    print(f"outside write -> visible in cache ({args.writes} writes, {cache.mode})")
+    if coherence:
+        print(f"  staleness       {summary(coherence)}")
+    if timed_out:
+        print(f"  timed out       {timed_out} write(s) not seen in {args.timeout:g} s")
+    print("cache stats")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
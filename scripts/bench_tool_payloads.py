@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark tool payload size, prompt tokens and serialization time.
+
+Compares the original verbose tool outputs ("before") with the compact,
+projected payloads the server now returns ("after").  Each shape is timed
+through the path the server actually uses (a genai ``types.Part`` dumped to
+JSON) and, for reference, with the stdlib json and orjson encoders.  API
+response serialization (legacy jsonable_encoder + JSONResponse vs. the typed
+Pydantic response models) is measured separately.  Run from the repo root
+with the server's virtualenv active:
+
+    python scripts/bench_tool_payloads.py
+    python scripts/bench_tool_payloads.py --count-tokens   # needs GEMINI_API_KEY
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from google.genai import types
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
+# Importing the server only needs a key to build the client; token counting
+# is the only step that actually calls the API.
+os.environ.setdefault("GEMINI_API_KEY", "unused-for-offline-benchmark")
+
+import agentic_rag  # noqa: E402
+
+
+def legacy_user_timetable():
+    """The pre-compaction get_user_timetable output: all seven days, verbose keys."""
+    courses = agentic_rag.student_course_data.get("student", {}).get("courses", [])
+    week = {day: [] for day in agentic_rag.WEEKDAYS}
+    for course in courses:
+        for slot in course.get("schedule", []):
+            if slot.get("day") not in week:
+                continue
+            start, _, end = slot.get("time", "").partition(" - ")
+            week[slot["day"]].append(
+                {
+                    "start_time": start.strip(),
+                    "end_time": end.strip(),
+                    "class": course.get("subject", ""),
+                    "teacher": course.get("teacher", ""),
+                    "room": slot.get("room", ""),
+                }
+            )
+    for day in week:
+        week[day].sort(key=lambda x: x["start_time"])
+    return week
+
+
+def legacy_student_courses():
+    """The pre-compaction get_student_courses output (courses listed twice)."""
+    student = agentic_rag.student_course_data.get("student", {})
+    return {"student": student, "courses": student.get("courses", [])}
+
+
+CASES = [
+    (
+        "timetable (one day)",
+        legacy_user_timetable,
+        lambda: agentic_rag.get_user_timetable(days="Monday"),
+    ),
+    (
+        "timetable (one day, subject+time)",
+        legacy_user_timetable,
+        lambda: agentic_rag.get_user_timetable(
+            days="Monday", fields="subject,start_time,end_time"
+        ),
+    ),
+    (
+        "timetable (full week)",
+        legacy_user_timetable,
+        agentic_rag.get_user_timetable,
+    ),
+    (
+        "student courses",
+        legacy_student_courses,
+        agentic_rag.get_student_courses,
+    ),
+]
+
+
+def count_tokens(payload: dict) -> int:
+    """Count prompt tokens for a payload using the Gemini tokenizer."""
+    result = agentic_rag.client.models.count_tokens(
+        model="gemini-2.0-flash", contents=json.dumps(payload)
+    )
+    return result.total_tokens
+
+
+def per_call_us(fn, repeat: int) -> float:
+    """Average wall time of ``fn`` in microseconds."""
+    return timeit.timeit(fn, number=repeat) * 1e6 / repeat
+
+
+def part_json(payload: dict) -> bytes:
+    """Serialize a tool payload the way it is sent back to Gemini."""
+    part = types.Part.from_function_response(name="tool", response=payload)
+    return part.model_dump_json(exclude_none=True).encode()
+
+
+def bench_tool_payloads(count: bool, repeat: int) -> None:
+    header = (
+        f"{'case':<36} {'bytes':>13} {'tokens':>11}"
+        f" {'Part us':>17} {'json us':>15} {'orjson us':>15}"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for name, before_fn, after_fn in CASES:
+        before, after = before_fn(), after_fn()
+        sizes = [len(json.dumps(p).encode()) for p in (before, after)]
+        if count:
+            tokens = [count_tokens(p) for p in (before, after)]
+        else:
+            tokens = [s // 4 for s in sizes]
+
+        timings = [
+            [per_call_us(lambda p=p: encode(p), repeat) for p in (before, after)]
+            for encode in (part_json, json.dumps, orjson.dumps)
+        ]
+        columns = " ".join(f"{b:>7.2f}->{a:<7.2f}" for b, a in timings)
+        print(
+            f"{name:<36} {sizes[0]:>6}->{sizes[1]:<6} {tokens[0]:>5}->{tokens[1]:<5}"
+            f" {columns}"
+        )
+
+    if not count:
+        print("\nTokens are estimated as bytes / 4; --count-tokens gives exact counts.")
+
+
+def bench_api_responses(repeat: int) -> None:
+    """Time GET / response bodies: legacy dict path vs. typed response model."""
+    text = "\n".join(
+        f"- Class Name: {slot['subject']}\n    - Time: {slot['start_time']}"
+        f" - {slot['end_time']}\n    - Teacher: {slot['teacher']}"
+        f"\n    - Room: {slot['room']}"
+        for slots in agentic_rag.get_user_timetable().values()
+        for slot in slots
+    )
+    adapter = TypeAdapter(agentic_rag.ChatResponse)
+    model = agentic_rag.ChatResponse(text=text)
+
+    legacy = per_call_us(
+        lambda: JSONResponse(content=jsonable_encoder({"text": text})).body, repeat
+    )
+    typed = per_call_us(lambda: adapter.dump_json(model), repeat)
+    print(f"\nAPI response ({len(text)} chars of text)")
+    print(f"  jsonable_encoder + JSONResponse  {legacy:8.2f} us")
+    print(f"  ChatResponse (Pydantic)          {typed:8.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--count-tokens",
+        action="store_true",
+        help="Count tokens with the Gemini API instead of estimating (bytes / 4)",
+    )
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    bench_tool_payloads(args.count_tokens, args.repeat)
+    bench_api_responses(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
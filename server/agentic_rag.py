@@ -1,15 +1,27 @@
 import datetime
+import functools
+import inspect
 import json
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
 
+import orjson
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure, PyMongoError
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -33,6 +45,11 @@ CORS_ORIGINS = os.environ.get(
 )
 SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
 SERVER_PORT = int(os.environ.get("SERVER_PORT", "8000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_RATE_LIMIT = float(os.environ.get("BATCH_RATE_LIMIT", "5"))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "10000"))
+TODO_CACHE_MAX_USERS = int(os.environ.get("TODO_CACHE_MAX_USERS", "1000"))
+TODO_CACHE_POLL_INTERVAL = float(os.environ.get("TODO_CACHE_POLL_INTERVAL", "2"))
 
 if not GEMINI_API_KEY:
     raise ValueError(
@@ -97,6 +114,94 @@ When providing an event, format it as follows:
 """
 
 
+# ===================================================================
+# Compact tool payloads
+# ===================================================================
+# Tool results are fed back to the model verbatim, so every key and empty
+# value costs prompt tokens.  Records are kept as slotted dataclasses and
+# projected to plain dicts only at the tool boundary, dropping blank values
+# and any field the model did not ask for.
+WEEKDAYS = (
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+)
+
+
+@dataclass(slots=True, frozen=True)
+class ClassSlot:
+    """A single scheduled class."""
+
+    start_time: str
+    end_time: str
+    subject: str
+    teacher: str
+    room: str
+
+
+@dataclass(slots=True, frozen=True)
+class SessionSlot:
+    """A class currently in session for some batch."""
+
+    batch: str
+    start_time: str
+    end_time: str
+    subject: str
+    teacher: str
+    room: str
+
+
+@dataclass(slots=True, frozen=True)
+class Event:
+    """A campus event from events.json."""
+
+    event_name: str
+    date: str
+    start_time: str
+    end_time: str
+    venue: str
+    details: str
+
+
+def _select_fields(fields: str, allowed: tuple[str, ...]) -> tuple[str, ...] | None:
+    """Parse a comma-separated projection, or None if any name is unknown.
+
+    An empty string selects all of ``allowed``.
+    """
+    if not fields:
+        return allowed
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    if not wanted or not wanted <= set(allowed):
+        return None
+    return tuple(f for f in allowed if f in wanted)
+
+
+def _fields_error(allowed: tuple[str, ...]) -> dict:
+    return {"error": f"Unknown field. Choose from: {', '.join(allowed)}."}
+
+
+def _project(item, fields: tuple[str, ...]) -> dict:
+    """Convert a slotted record to a dict holding only non-empty ``fields``."""
+    out = {}
+    for name in fields:
+        value = getattr(item, name)
+        if value not in ("", None):
+            out[name] = value
+    return out
+
+
+def _split_time_range(time_str: str) -> tuple[str, str]:
+    """Split ``"HH:MM - HH:MM"`` into start and end, tolerating extra spaces."""
+    if "-" not in time_str:
+        return time_str.strip(), ""
+    start, _, end = time_str.partition("-")
+    return start.strip(), end.strip()
+
+
 # ===================================================================
 # Data loading
 # ===================================================================
@@ -118,13 +223,341 @@ student_course_data = _load_json(STUDENT_COURSE_PATH)
 events_data = _load_json(EVENTS_PATH)
 
 
+@functools.cache
+def _student_timetable() -> dict[str, tuple[ClassSlot, ...]]:
+    """Build the student's weekly timetable once from studentCourse.json."""
+    student = student_course_data.get("student", {})
+    week: dict[str, list[ClassSlot]] = {day: [] for day in WEEKDAYS}
+
+    for course in student.get("courses", []):
+        subject = course.get("subject", "")
+        teacher = course.get("teacher", "")
+        for slot in course.get("schedule", []):
+            day = slot.get("day", "")
+            if day not in week:
+                continue
+            start_time, end_time = _split_time_range(slot.get("time", ""))
+            week[day].append(
+                ClassSlot(
+                    start_time=start_time,
+                    end_time=end_time,
+                    subject=subject,
+                    teacher=teacher,
+                    room=slot.get("room", ""),
+                )
+            )
+
+    return {
+        day: tuple(sorted(slots, key=lambda s: s.start_time))
+        for day, slots in week.items()
+    }
+
+
+@functools.cache
+def _events() -> tuple[Event, ...]:
+    """Parse events.json into typed records once."""
+    return tuple(
+        Event(
+            event_name=e.get("event_name", ""),
+            date=e.get("date", ""),
+            start_time=e.get("start_time", ""),
+            end_time=e.get("end_time", ""),
+            venue=e.get("venue", ""),
+            details=e.get("details", ""),
+        )
+        for e in events_data.get("events", [])
+    )
+
+
+_DAY_ALIASES = {
+    **{day.lower(): day for day in WEEKDAYS},
+    **{day[:3].lower(): day for day in WEEKDAYS},
+}
+
+
+def _resolve_days(days: str) -> tuple[str, ...] | None:
+    """Map comma-separated day names to weekdays, or None if any is unknown.
+
+    Accepts full names, three-letter abbreviations, 'today' and 'tomorrow'.
+    An empty string means the whole week.
+    """
+    if not days:
+        return WEEKDAYS
+    now = datetime.datetime.now()
+    relative = {
+        "today": now.strftime("%A"),
+        "tomorrow": (now + datetime.timedelta(days=1)).strftime("%A"),
+    }
+    wanted = set()
+    for token in days.split(","):
+        token = token.strip().lower()
+        if not token:
+            continue
+        day = relative.get(token) or _DAY_ALIASES.get(token)
+        if day is None:
+            return None
+        wanted.add(day)
+    if not wanted:
+        return None
+    return tuple(day for day in WEEKDAYS if day in wanted)
+
+
+# ===================================================================
+# To-do cache
+# ===================================================================
+# The SvelteKit routes write to the same ``todos`` collection, so cached
+# lists are kept coherent by tailing a change stream.  Standalone servers
+# don't support change streams; there the cache re-reads its cached users
+# every TODO_CACHE_POLL_INTERVAL seconds instead.
+def _load_todos(user_id: str) -> list[tuple]:
+    """Fetch a user's todos as ``(_id, title)`` pairs, newest first."""
+    docs = todos_collection.find(
+        {"userId": user_id}, projection={"title": 1}
+    ).sort("createdAt", -1)
+    return [(doc["_id"], doc.get("title", "")) for doc in docs]
+
+
+class _TodoCache:
+    """Per-user LRU cache of to-do lists with write-through and invalidation.
+
+    Holds at most ``max_users`` lists.  Outside writes are picked up from a
+    change stream (or polling fallback) running on a daemon thread that is
+    started on first use.
+    """
+
+    def __init__(self, collection, max_users: int, poll_interval: float):
+        self._collection = collection
+        self._max_users = max_users
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, list[tuple]] = OrderedDict()
+        self._owner: dict = {}  # todo _id -> user_id, for cached todos only
+        # Guards against caching a load that raced an invalidation.  The
+        # global epoch moves only when everything is dropped; per-user
+        # epochs are tracked only while that user has loads in flight.
+        self._epoch = 0
+        self._loading: dict[str, list[int]] = {}  # user_id -> [loads, epoch]
+        self._watcher: threading.Thread | None = None
+        self.mode = "off"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._lag_samples: deque[float] = deque(maxlen=1000)
+
+    # -- reads / writes ---------------------------------------------------
+    def get(self, user_id: str) -> list[str]:
+        """Return the user's todo titles, newest first."""
+        self._ensure_watcher()
+        with self._lock:
+            items = self._entries.get(user_id)
+            if items is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return [title for _, title in items]
+            self.misses += 1
+            loading = self._loading.setdefault(user_id, [0, 0])
+            loading[0] += 1
+            snapshot = (self._epoch, loading[1])
+
+        items = None
+        try:
+            items = _load_todos(user_id)
+        finally:
+            with self._lock:
+                loading[0] -= 1
+                if not loading[0]:
+                    del self._loading[user_id]
+                # An invalidation during the load may make ``items`` stale.
+                if items is not None and snapshot == (self._epoch, loading[1]):
+                    self._store(user_id, items)
+        return [title for _, title in items]
+
+    def add(self, user_id: str, todo_id, title: str) -> None:
+        """Write-through for a todo just inserted by this server."""
+        with self._lock:
+            if todo_id in self._owner:
+                return  # a reload after the insert already picked it up
+            items = self._entries.get(user_id)
+            if items is not None:
+                items.insert(0, (todo_id, title))
+                self._owner[todo_id] = user_id
+
+    def _store(self, user_id: str, items: list[tuple]) -> None:
+        self._drop(user_id)
+        self._entries[user_id] = items
+        for todo_id, _ in items:
+            self._owner[todo_id] = user_id
+        while len(self._entries) > self._max_users:
+            evicted_items = self._entries.popitem(last=False)[1]
+            self._forget(evicted_items)
+            self.evictions += 1
+
+    def _drop(self, user_id: str) -> None:
+        items = self._entries.pop(user_id, None)
+        if items is not None:
+            self._forget(items)
+
+    def _forget(self, items: list[tuple]) -> None:
+        for todo_id, _ in items:
+            self._owner.pop(todo_id, None)
+
+    def _invalidate(self, user_id: str | None, lag: float | None) -> None:
+        """Drop one user's list (or everything if ``user_id`` is None)."""
+        with self._lock:
+            if user_id is None:
+                self._epoch += 1
+                if not self._entries:
+                    return
+                self._entries.clear()
+                self._owner.clear()
+            else:
+                loading = self._loading.get(user_id)
+                if loading is not None:
+                    loading[1] += 1
+                if user_id not in self._entries:
+                    return
+                self._drop(user_id)
+            self.invalidations += 1
+            if lag is not None:
+                self._lag_samples.append(max(0.0, lag))
+
+    # -- coherence ---------------------------------------------------------
+    def _ensure_watcher(self) -> None:
+        if self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(
+                    target=self._watch, name="todo-cache-watcher", daemon=True
+                )
+                self._watcher.start()
+
+    def _watch(self) -> None:
+        while True:
+            try:
+                with self._collection.watch() as stream:
+                    self.mode = "change_stream"
+                    # Anything cached before the stream opened may be stale.
+                    self._invalidate(None, None)
+                    for change in stream:
+                        self._apply_change(change)
+            except OperationFailure as exc:
+                # 40573: change streams need a replica set or sharded cluster
+                if exc.code == 40573 or "replica set" in str(exc):
+                    logger.info("Change streams unavailable; polling todo changes")
+                    self._poll_forever()
+                    return
+                logger.warning("Todo change stream failed: %s", exc)
+            except PyMongoError as exc:
+                logger.warning("Todo change stream failed: %s", exc)
+            self.mode = "reconnecting"
+            self._invalidate(None, None)
+            time.sleep(self._poll_interval)
+
+    def _apply_change(self, change: dict) -> None:
+        op = change.get("operationType")
+        if op in ("drop", "rename", "dropDatabase", "invalidate"):
+            self._invalidate(None, self._change_lag(change))
+            return
+
+        todo_id = change.get("documentKey", {}).get("_id")
+        with self._lock:
+            if op == "insert" and todo_id in self._owner:
+                return  # already applied via write-through
+            user_id = self._owner.get(todo_id)
+            if op in ("insert", "replace"):
+                user_id = change.get("fullDocument", {}).get("userId", user_id)
+            if user_id is None:
+                # Updates and deletes carry only the _id.  If the todo isn't
+                # cached it may belong to a list being loaded right now, so
+                # no in-flight load can be trusted.
+                for loading in self._loading.values():
+                    loading[1] += 1
+                return
+        self._invalidate(user_id, self._change_lag(change))
+
+    @staticmethod
+    def _change_lag(change: dict) -> float | None:
+        """Seconds between the write on the server and now."""
+        wall_time = change.get("wallTime")
+        if wall_time is not None:
+            if wall_time.tzinfo is None:
+                wall_time = wall_time.replace(tzinfo=datetime.timezone.utc)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            return (now - wall_time).total_seconds()
+        cluster_time = change.get("clusterTime")
+        if cluster_time is not None:
+            return time.time() - cluster_time.time
+        return None
+
+    def _poll_forever(self) -> None:
+        self.mode = "poll"
+        last_poll = time.monotonic()
+        while True:
+            time.sleep(self._poll_interval)
+            try:
+                self._poll_once(time.monotonic() - last_poll)
+            except PyMongoError as exc:
+                logger.warning("Todo cache poll failed: %s", exc)
+                self._invalidate(None, None)
+            last_poll = time.monotonic()
+
+    def _poll_once(self, since_last: float) -> None:
+        """Re-read every cached user's todos and drop lists that changed.
+
+        The exact write time is unknown here, so staleness is recorded as
+        the time since the previous poll (an upper bound).
+        """
+        with self._lock:
+            users = list(self._entries)
+            cached = {u: list(self._entries[u]) for u in users}
+        if not users:
+            return
+
+        fresh: dict[str, list[tuple]] = {u: [] for u in users}
+        docs = self._collection.find(
+            {"userId": {"$in": users}}, projection={"title": 1, "userId": 1}
+        ).sort("createdAt", -1)
+        for doc in docs:
+            fresh[doc["userId"]].append((doc["_id"], doc.get("title", "")))
+
+        for user_id in users:
+            if fresh[user_id] != cached[user_id]:
+                self._invalidate(user_id, since_last)
+
+    def stats(self) -> dict:
+        """Hit rate, size and staleness lag of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            lags = sorted(self._lag_samples)
+            return {
+                "mode": self.mode,
+                "users_cached": len(self._entries),
+                "max_users": self._max_users,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "staleness_lag_ms": _latency_stats([lag * 1000 for lag in lags]),
+            }
+
+
+todo_cache = (
+    _TodoCache(todos_collection, TODO_CACHE_MAX_USERS, TODO_CACHE_POLL_INTERVAL)
+    if TODO_CACHE_MAX_USERS > 0
+    else None
+)
+
+
 # ===================================================================
 # Tool functions  (used by Gemini function-calling)
 # ===================================================================
 def get_student_courses() -> dict:
     """Returns the student's enrolled courses from studentCourse.json."""
-    student = student_course_data.get("student", {})
-    courses = student.get("courses", [])
+    student = dict(student_course_data.get("student", {}))
+    courses = student.pop("courses", [])
     return {"student": student, "courses": courses}
 
 
@@ -134,9 +567,9 @@ def get_todos(user_id: str) -> dict:
     Args:
         user_id: The authenticated user's ID.
     """
-    docs = todos_collection.find({"userId": user_id}).sort("createdAt", -1)
-    todo_list = [doc.get("title", "") for doc in docs]
-    return {"todos": todo_list}
+    if todo_cache is not None:
+        return {"todos": todo_cache.get(user_id)}
+    return {"todos": [title for _, title in _load_todos(user_id)]}
 
 
 def add_todo(user_id: str, task: str) -> dict:
@@ -149,7 +582,7 @@ def add_todo(user_id: str, task: str) -> dict:
     if not task:
         return {"status": "Error", "message": "Task cannot be empty."}
 
-    todos_collection.insert_one(
+    result = todos_collection.insert_one(
         {
             "userId": user_id,
             "title": task,
@@ -157,69 +590,51 @@ def add_todo(user_id: str, task: str) -> dict:
             "createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(),
         }
     )
+    if todo_cache is not None:
+        todo_cache.add(user_id, result.inserted_id, task)
     return {"status": "Success", "message": f"Added '{task}' to your to-do list."}
 
 
-def get_user_timetable() -> dict:
-    """Gets the user's specific timetable based on their enrolled courses.
+def get_user_timetable(days: str = "", fields: str = "") -> dict:
+    """Gets the user's weekly timetable based on their enrolled courses.
 
-    Returns a dictionary with days as keys and list of classes as values.
-    """
-    student = student_course_data.get("student", {})
-    courses = student.get("courses", [])
-
-    user_timetable: dict[str, list] = {
-        day: []
-        for day in (
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday",
-        )
-    }
+    Returns a dictionary with days as keys and lists of classes as values.
+    Requested days without classes map to an empty list; for the whole week
+    they are omitted.
 
-    for course in courses:
-        subject = course.get("subject", "")
-        teacher = course.get("teacher", "")
-        for slot in course.get("schedule", []):
-            day = slot.get("day", "")
-            time_str = slot.get("time", "")
-            room = slot.get("room", "")
-            if day not in user_timetable:
-                continue
-
-            start_time, end_time = "", ""
-            if " - " in time_str:
-                parts = time_str.split(" - ")
-                start_time = parts[0].strip()
-                end_time = parts[1].strip()
-            else:
-                start_time = time_str
-
-            user_timetable[day].append(
-                {
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "class": subject,
-                    "teacher": teacher,
-                    "room": room,
-                }
-            )
-
-    for day in user_timetable:
-        user_timetable[day].sort(key=lambda x: x["start_time"])
+    Args:
+        days: Optional comma-separated day names (e.g. 'Monday,Fri',
+            'today' or 'tomorrow'). Defaults to the whole week.
+        fields: Optional comma-separated subset of start_time, end_time,
+            subject, teacher, room. Defaults to all fields.
+    """
+    selected = _resolve_days(days)
+    if selected is None:
+        return {
+            "error": "Invalid day. Use day names (e.g. 'Monday' or 'Mon'), "
+            "'today' or 'tomorrow'."
+        }
+    picked = _select_fields(fields, ClassSlot.__slots__)
+    if picked is None:
+        return _fields_error(ClassSlot.__slots__)
 
-    return user_timetable
+    week = _student_timetable()
+    if not any(week[day] for day in selected):
+        return {"message": f"You have no classes scheduled for {', '.join(selected)}."}
+    return {
+        day: [_project(slot, picked) for slot in week[day]]
+        for day in selected
+        if week[day] or days
+    }
 
 
-def get_schedule_for_day(date: str = "today") -> dict:
+def get_schedule_for_day(date: str = "today", fields: str = "") -> dict:
     """Retrieves the student's class schedule for a specific day.
 
     Args:
         date: The date in YYYY-MM-DD format, or 'today'.
+        fields: Optional comma-separated subset of start_time, end_time,
+            subject, teacher, room. Defaults to all fields.
     """
     if date == "today":
         day_of_week = datetime.datetime.now().strftime("%A")
@@ -230,30 +645,45 @@ def get_schedule_for_day(date: str = "today") -> dict:
         except ValueError:
             return {"error": "Invalid date format. Please use YYYY-MM-DD."}
 
-    day_schedule = get_user_timetable().get(day_of_week, [])
+    picked = _select_fields(fields, ClassSlot.__slots__)
+    if picked is None:
+        return _fields_error(ClassSlot.__slots__)
+
+    day_schedule = _student_timetable().get(day_of_week, ())
     if not day_schedule:
         return {"message": f"You have no classes scheduled for {day_of_week}."}
-    return {"date": day_of_week, "schedule": day_schedule}
+    return {
+        "date": day_of_week,
+        "schedule": [_project(slot, picked) for slot in day_schedule],
+    }
+
 
+def get_next_class(fields: str = "") -> dict:
+    """Finds the next upcoming class based on the current time.
+
+    Args:
+        fields: Optional comma-separated subset of start_time, end_time,
+            subject, teacher, room. Defaults to all fields.
+    """
+    picked = _select_fields(fields, ClassSlot.__slots__)
+    if picked is None:
+        return _fields_error(ClassSlot.__slots__)
 
-def get_next_class() -> dict:
-    """Finds the next upcoming class based on the current time."""
     now = datetime.datetime.now()
     current_time = now.time()
     current_day = now.strftime("%A")
 
-    day_schedule = get_user_timetable().get(current_day, [])
+    day_schedule = _student_timetable().get(current_day, ())
     if not day_schedule:
         return {"message": f"You have no classes scheduled for {current_day}."}
 
-    for item in day_schedule:
-        start_str = item.get("start_time", "")
-        if not start_str:
+    for slot in day_schedule:
+        if not slot.start_time:
             continue
         try:
-            start_time = datetime.datetime.strptime(start_str, "%H:%M").time()
+            start_time = datetime.datetime.strptime(slot.start_time, "%H:%M").time()
             if start_time > current_time:
-                return {"next_class": item}
+                return {"next_class": _project(slot, picked)}
         except ValueError:
             continue
 
@@ -263,33 +693,33 @@ def get_next_class() -> dict:
 def check_for_conflicts() -> dict:
     """Checks if any classes clash with events today."""
     current_day = datetime.datetime.now().strftime("%A")
-    day_schedule = get_user_timetable().get(current_day, [])
-    events = events_data.get("events", [])
+    day_schedule = _student_timetable().get(current_day, ())
 
     conflicts = []
-    for class_item in day_schedule:
-        cs, ce = class_item.get("start_time", ""), class_item.get("end_time", "")
-        if not (cs and ce):
+    for slot in day_schedule:
+        if not (slot.start_time and slot.end_time):
             continue
         try:
-            c_start = datetime.datetime.strptime(cs, "%H:%M")
-            c_end = datetime.datetime.strptime(ce, "%H:%M")
+            c_start = datetime.datetime.strptime(slot.start_time, "%H:%M")
+            c_end = datetime.datetime.strptime(slot.end_time, "%H:%M")
         except ValueError:
             continue
 
-        for event in events:
-            es, ee = event.get("start_time", ""), event.get("end_time", "")
-            if not (es and ee):
+        for event in _events():
+            if not (event.start_time and event.end_time):
                 continue
             try:
-                e_start = datetime.datetime.strptime(es, "%H:%M")
-                e_end = datetime.datetime.strptime(ee, "%H:%M")
+                e_start = datetime.datetime.strptime(event.start_time, "%H:%M")
+                e_end = datetime.datetime.strptime(event.end_time, "%H:%M")
             except ValueError:
                 continue
 
             if max(c_start, e_start) < min(c_end, e_end):
                 conflicts.append(
-                    {"conflicting_class": class_item, "conflicting_event": event}
+                    {
+                        "conflicting_class": _project(slot, ClassSlot.__slots__),
+                        "conflicting_event": _project(event, Event.__slots__),
+                    }
                 )
 
     if not conflicts:
@@ -297,41 +727,54 @@ def check_for_conflicts() -> dict:
     return {"conflicts": conflicts}
 
 
-def get_current_classes() -> dict:
-    """Gets all classes currently in session across all batches."""
-    now = datetime.datetime.now()
+def _classes_in_session(now: datetime.datetime) -> list[SessionSlot]:
+    """Return every batch's class whose time range contains ``now``."""
     current_time = now.time()
     current_day = now.strftime("%A")
 
-    current_classes = []
+    in_session = []
     for batch_name, batch_schedule in timetable_data.items():
         if not isinstance(batch_schedule, dict):
             continue
         for item in batch_schedule.get(current_day, []):
-            time_str = item.get("time", "")
-            if " - " not in time_str:
+            start_str, end_str = _split_time_range(item.get("time", ""))
+            if not (start_str and end_str):
                 continue
             try:
-                parts = time_str.split(" - ")
-                start = datetime.datetime.strptime(parts[0].strip(), "%H:%M").time()
-                end = datetime.datetime.strptime(parts[1].strip(), "%H:%M").time()
-                if start <= current_time <= end:
-                    current_classes.append(
-                        {
-                            "batch": batch_name,
-                            "subject": item.get("subject", ""),
-                            "teacher": item.get("teacher", ""),
-                            "room": item.get("room", ""),
-                            "start_time": parts[0].strip(),
-                            "end_time": parts[1].strip(),
-                        }
-                    )
+                start = datetime.datetime.strptime(start_str, "%H:%M").time()
+                end = datetime.datetime.strptime(end_str, "%H:%M").time()
             except ValueError:
                 continue
+            if start <= current_time <= end:
+                in_session.append(
+                    SessionSlot(
+                        batch=batch_name,
+                        start_time=start_str,
+                        end_time=end_str,
+                        subject=item.get("subject", ""),
+                        teacher=item.get("teacher", ""),
+                        room=item.get("room", ""),
+                    )
+                )
+    return in_session
+
+
+def get_current_classes(fields: str = "") -> dict:
+    """Gets all classes currently in session across all batches.
+
+    Args:
+        fields: Optional comma-separated subset of batch, start_time,
+            end_time, subject, teacher, room. Defaults to all fields.
+    """
+    picked = _select_fields(fields, SessionSlot.__slots__)
+    if picked is None:
+        return _fields_error(SessionSlot.__slots__)
 
+    now = datetime.datetime.now()
+    current_classes = [_project(s, picked) for s in _classes_in_session(now)]
     return {
-        "current_time": current_time.strftime("%H:%M"),
-        "current_day": current_day,
+        "current_time": now.strftime("%H:%M"),
+        "current_day": now.strftime("%A"),
         "classes_in_session": current_classes,
         "total_classes": len(current_classes),
     }
@@ -344,18 +787,16 @@ def get_free_classrooms() -> dict:
         return {"error": "Classroom data not found"}
 
     all_classrooms: list = classes_data.get("classes", [])
-    current = get_current_classes()
+    now = datetime.datetime.now()
     occupied = {
-        info.get("room", "").strip()
-        for info in current.get("classes_in_session", [])
-        if info.get("room", "").strip()
+        s.room.strip() for s in _classes_in_session(now) if s.room.strip()
     }
 
     free = [c for c in all_classrooms if c not in occupied]
     return {
-        "current_time": current.get("current_time"),
-        "current_day": current.get("current_day"),
-        "occupied_classrooms": list(occupied),
+        "current_time": now.strftime("%H:%M"),
+        "current_day": now.strftime("%A"),
+        "occupied_classrooms": sorted(occupied),
         "free_classrooms": free,
         "total_free": len(free),
     }
@@ -377,6 +818,40 @@ _TOOL_MAP = {
     "get_free_classrooms": get_free_classrooms,
 }
 
+# Tools exposed to the model in the chat loop
+_CHAT_TOOLS = [
+    get_todos,
+    add_todo,
+    get_schedule_for_day,
+    get_next_class,
+    check_for_conflicts,
+    get_user_timetable,
+    get_current_classes,
+    get_free_classrooms,
+]
+
+# Tools whose result depends on the caller, so user_id is injected
+_USER_SCOPED_TOOLS = frozenset(
+    name
+    for name, fn in _TOOL_MAP.items()
+    if "user_id" in inspect.signature(fn).parameters
+)
+
+# Tools with side effects; never shared between calls
+_MUTATING_TOOLS = frozenset({"add_todo"})
+
+# Tools whose result depends on the current time; only shared within a minute
+_CLOCK_TOOLS = frozenset(
+    {
+        "get_user_timetable",
+        "get_schedule_for_day",
+        "get_next_class",
+        "check_for_conflicts",
+        "get_current_classes",
+        "get_free_classrooms",
+    }
+)
+
 
 def _execute_tool_call(
     function_call: types.FunctionCall, user_id: str
@@ -393,9 +868,7 @@ def _execute_tool_call(
         )
 
     # Inject user_id for functions that require it
-    import inspect
-    sig = inspect.signature(fn)
-    if "user_id" in sig.parameters:
+    if fn_name in _USER_SCOPED_TOOLS:
         fn_args["user_id"] = user_id
 
     try:
@@ -408,82 +881,345 @@ def _execute_tool_call(
 
 
 # ===================================================================
-# Routes
+# Chat loop
 # ===================================================================
-@app.get("/health")
-def health_check():
-    """Health check endpoint for monitoring."""
-    return {"status": "ok"}
-
-
-@app.get("/")
-def chat(
-    query: str = Query(..., min_length=1, max_length=2000, description="User query"),
-    user_id: str = Query("anonymous", description="Authenticated user ID"),
-):
-    """Main chat endpoint that processes queries via Gemini with tool calling."""
-    all_tools = [
-        get_todos,
-        add_todo,
-        get_schedule_for_day,
-        get_next_class,
-        check_for_conflicts,
-        get_user_timetable,
-        get_current_classes,
-        get_free_classrooms,
-    ]
+class _RateLimiter:
+    """Spaces calls out to at most ``rate`` per second across threads."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _run_chat(
+    query: str,
+    user_id: str,
+    run_tool: Callable[
+        [types.FunctionCall, str], types.FunctionResponse
+    ] = _execute_tool_call,
+    limiter: _RateLimiter | None = None,
+) -> str:
+    """Answer a single query, running Gemini's tool calls until it replies.
 
+    Args:
+        query: The user's message.
+        user_id: The authenticated user's ID, injected into user-scoped tools.
+        run_tool: Executes one tool call; batches swap in a shared cache.
+        limiter: Optional rate limiter acquired before every model call.
+    """
     # Build per-request conversation (stateless)
     conversation: list[types.Content] = [
         types.Content(role="user", parts=[types.Part.from_text(text=query)])
     ]
+    config = types.GenerateContentConfig(
+        system_instruction=CUSTOM_INSTRUCTION,
+        tools=_CHAT_TOOLS,
+        # Tool calls are run by the loop below so user_id can be injected
+        # and batches can share results.
+        automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+    )
 
-    try:
-        # Allow up to 10 rounds of tool calling before giving up
-        for _round in range(10):
-            response = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=conversation,
-                config=types.GenerateContentConfig(
-                    system_instruction=CUSTOM_INSTRUCTION,
-                    tools=all_tools,
-                ),
+    # Allow up to 10 rounds of tool calling before giving up
+    for _round in range(10):
+        if limiter is not None:
+            limiter.acquire()
+        response = client.models.generate_content(
+            model="gemini-2.0-flash",
+            contents=conversation,
+            config=config,
+        )
+
+        candidate = response.candidates[0]
+        conversation.append(candidate.content)
+
+        # Check if the model wants to call tools
+        function_calls = [
+            part.function_call
+            for part in candidate.content.parts
+            if part.function_call is not None
+        ]
+
+        if not function_calls:
+            # Model returned a text response — we're done
+            break
+
+        # Execute all requested tool calls
+        tool_responses = [run_tool(fc, user_id) for fc in function_calls]
+        conversation.append(
+            types.Content(
+                role="user",
+                parts=[types.Part(function_response=r) for r in tool_responses],
             )
+        )
+    else:
+        logger.warning("Tool-call loop exceeded 10 rounds for query: %s", query[:100])
 
-            candidate = response.candidates[0]
-            conversation.append(candidate.content)
-
-            # Check if the model wants to call tools
-            function_calls = [
-                part.function_call
-                for part in candidate.content.parts
-                if part.function_call is not None
-            ]
-
-            if not function_calls:
-                # Model returned a text response — we're done
-                break
-
-            # Execute all requested tool calls
-            tool_responses = [
-                _execute_tool_call(fc, user_id) for fc in function_calls
-            ]
-            conversation.append(
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_function_response(r) for r in tool_responses],
-                )
+    return response.text
+
+
+# ===================================================================
+# Batch processing
+# ===================================================================
+def _clock_bucket() -> str:
+    """The current minute; results of clock-dependent tools share this key."""
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+
+
+# Shared by every batch in this process so BATCH_RATE_LIMIT is a global cap
+_batch_limiter = _RateLimiter(BATCH_RATE_LIMIT)
+
+
+class _SharedToolCalls:
+    """Runs each distinct tool call once per batch and shares the result.
+
+    Calls are keyed by name and arguments, plus user_id for user-scoped
+    tools, so e.g. one ``get_current_classes`` serves every item.  Tools
+    that read the clock are also keyed by the current minute, so a long
+    batch never serves stale "current" results.  Mutating tools always run
+    and drop that user's cached results.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: dict[tuple, Future] = {}
+        self._bucket = ""
+        self.calls = 0
+        self.hits = 0
+
+    def run(
+        self, function_call: types.FunctionCall, user_id: str
+    ) -> types.FunctionResponse:
+        fn_name = function_call.name
+        with self._lock:
+            self.calls += 1
+
+        if fn_name in _MUTATING_TOOLS:
+            with self._lock:
+                for key in [k for k in self._results if k[1] == user_id]:
+                    del self._results[key]
+            return _execute_tool_call(function_call, user_id)
+
+        args = dict(function_call.args) if function_call.args else {}
+        bucket = _clock_bucket() if fn_name in _CLOCK_TOOLS else None
+        key = (
+            fn_name,
+            user_id if fn_name in _USER_SCOPED_TOOLS else None,
+            json.dumps(args, sort_keys=True, default=str),
+            bucket,
+        )
+        with self._lock:
+            if bucket is not None and bucket != self._bucket:
+                # Drop results from earlier minutes; they can't be hit again.
+                self._results = {
+                    k: v for k, v in self._results.items() if k[3] in (None, bucket)
+                }
+                self._bucket = bucket
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                future.set_result(_execute_tool_call(function_call, user_id))
+            except Exception as exc:
+                # Fail waiters now and let a later call retry, rather than
+                # leaving an unfinished Future that blocks them forever.
+                with self._lock:
+                    if self._results.get(key) is future:
+                        del self._results[key]
+                future.set_exception(exc)
+                raise
+        return future.result()
+
+
+def parse_batch(text: str) -> list[dict]:
+    """Parse JSONL batch input into ``{"user_id", "query"}`` items.
+
+    Each line must be an object with a non-empty ``query``; ``user_id``
+    defaults to ``"anonymous"`` and an optional ``id`` is echoed back.
+    Blank lines are skipped.
+
+    Raises:
+        ValueError: If a line is malformed or the batch is too large.
+    """
+    items = []
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Line {lineno}: invalid JSON ({exc.msg}).") from exc
+        if not isinstance(obj, dict):
+            raise ValueError(f"Line {lineno}: expected a JSON object.")
+
+        query = obj.get("query")
+        user_id = obj.get("user_id", "anonymous")
+        if not isinstance(query, str) or not 1 <= len(query) <= 2000:
+            raise ValueError(f"Line {lineno}: 'query' must be 1-2000 characters.")
+        if not isinstance(user_id, str):
+            raise ValueError(f"Line {lineno}: 'user_id' must be a string.")
+
+        item = {"user_id": user_id, "query": query}
+        if "id" in obj:
+            item["id"] = obj["id"]
+        items.append(item)
+
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Batch exceeds the limit of {BATCH_MAX_ITEMS} items.")
+    return items
+
+
+def _latency_stats(latencies_ms: list[float]) -> dict:
+    """Summarise per-item latencies in milliseconds."""
+    if not latencies_ms:
+        return {}
+    ordered = sorted(latencies_ms)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered), 1),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": round(ordered[-1], 1),
+    }
+
+
+def run_batch(
+    items: list[dict],
+    concurrency: int = BATCH_CONCURRENCY,
+    rate_limit: float | None = None,
+) -> Iterator[dict]:
+    """Answer batch items concurrently, yielding results as they finish.
+
+    Tool calls are shared across the whole batch.  Model calls go through
+    the process-wide ``_batch_limiter`` (BATCH_RATE_LIMIT per second across
+    all concurrent batches) unless ``rate_limit`` gives this batch its own
+    limit (0 disables throttling).  Each
+    result carries its input ``index``; the final record is ``{"stats": ...}``
+    with throughput, latency and tool-sharing figures.
+    """
+    shared = _SharedToolCalls()
+    limiter = _batch_limiter if rate_limit is None else _RateLimiter(rate_limit)
+    latencies: list[float] = []
+    errors = 0
+    started = time.perf_counter()
+
+    def answer(index: int, item: dict) -> dict:
+        t0 = time.perf_counter()
+        result = {"index": index, "user_id": item["user_id"]}
+        if "id" in item:
+            result["id"] = item["id"]
+        try:
+            result["text"] = _run_chat(
+                item["query"], item["user_id"], run_tool=shared.run, limiter=limiter
             )
-        else:
-            logger.warning("Tool-call loop exceeded 10 rounds for query: %s", query[:100])
+        except Exception as exc:
+            logger.exception("Error processing batch item %d", index)
+            result["error"] = str(exc)
+        result["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        return result
+
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [executor.submit(answer, i, item) for i, item in enumerate(items)]
+        for future in as_completed(futures):
+            result = future.result()
+            latencies.append(result["latency_ms"])
+            errors += "error" in result
+            yield result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "stats": {
+            "items": len(items),
+            "errors": errors,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_qps": round(len(items) / elapsed, 2) if elapsed else 0.0,
+            "latency": _latency_stats(latencies),
+            "tool_calls": shared.calls,
+            "tool_calls_shared": shared.hits,
+        }
+    }
 
-        return {"text": response.text}
 
+# ===================================================================
+# Response models
+# ===================================================================
+# Routes declare typed return values so FastAPI serializes them with
+# Pydantic directly instead of going through jsonable_encoder.
+class HealthResponse(BaseModel):
+    status: str
+
+
+class ChatResponse(BaseModel):
+    text: str | None
+
+
+# ===================================================================
+# Routes
+# ===================================================================
+@app.get("/health")
+def health_check() -> HealthResponse:
+    """Health check endpoint for monitoring."""
+    return HealthResponse(status="ok")
+
+
+@app.get("/stats")
+def stats():
+    """Runtime statistics for the server's caches."""
+    return {"todo_cache": todo_cache.stats() if todo_cache is not None else None}
+
+
+@app.get("/")
+def chat(
+    query: str = Query(..., min_length=1, max_length=2000, description="User query"),
+    user_id: str = Query("anonymous", description="Authenticated user ID"),
+) -> ChatResponse:
+    """Main chat endpoint that processes queries via Gemini with tool calling."""
+    try:
+        return ChatResponse(text=_run_chat(query, user_id))
     except Exception:
         logger.exception("Error processing chat query")
         raise HTTPException(status_code=500, detail="Failed to process your request.")
 
 
+@app.post("/batch")
+async def batch_chat(
+    request: Request,
+    concurrency: int = Query(
+        BATCH_CONCURRENCY, ge=1, le=64, description="Parallel queries"
+    ),
+):
+    """Answer a JSONL batch of ``{user_id, query}`` lines, streaming JSONL back."""
+    body = await request.body()
+    try:
+        items = parse_batch(body.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    lines = (orjson.dumps(r) + b"\n" for r in run_batch(items, concurrency))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
 # ===================================================================
 # Entry point
 # ===================================================================
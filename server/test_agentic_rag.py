@@ -0,0 +1,304 @@
+"""Tests for the agentic RAG server.  Run from server/ with ``pytest``."""
+import datetime
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "unused-in-tests")
+
+from google.genai import types  # noqa: E402
+
+import agentic_rag  # noqa: E402
+
+
+def _model_reply(*parts: types.Part) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(content=types.Content(role="model", parts=list(parts)))
+        ]
+    )
+
+
+def _freeze_now(monkeypatch, now: datetime.datetime) -> None:
+    """Make agentic_rag see ``now`` as the current time."""
+
+    class FrozenDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now if tz is None else now.astimezone(tz)
+
+    monkeypatch.setattr(
+        agentic_rag,
+        "datetime",
+        SimpleNamespace(
+            datetime=FrozenDatetime,
+            timedelta=datetime.timedelta,
+            timezone=datetime.timezone,
+        ),
+    )
+
+
+# ===================================================================
+# Compact tool payloads
+# ===================================================================
+def test_resolve_days_accepts_names_abbreviations_and_relative_days(monkeypatch):
+    _freeze_now(monkeypatch, datetime.datetime(2025, 10, 13, 9, 0))  # a Monday
+
+    assert agentic_rag._resolve_days("") == agentic_rag.WEEKDAYS
+    assert agentic_rag._resolve_days("fri, Monday") == ("Monday", "Friday")
+    assert agentic_rag._resolve_days("today,tomorrow") == ("Monday", "Tuesday")
+    assert agentic_rag._resolve_days("Mon,someday") is None
+    assert agentic_rag._resolve_days(",") is None
+
+
+def test_select_fields_rejects_unknown_names():
+    allowed = agentic_rag.ClassSlot.__slots__
+
+    assert agentic_rag._select_fields("", allowed) == allowed
+    assert agentic_rag._select_fields("room, subject", allowed) == ("subject", "room")
+    assert agentic_rag._select_fields("subject,bogus", allowed) is None
+
+
+def test_project_drops_blank_values():
+    slot = agentic_rag.ClassSlot("10:20", "11:50", "Vision", "", "AB2 - 205")
+
+    assert agentic_rag._project(slot, ("subject", "teacher", "room")) == {
+        "subject": "Vision",
+        "room": "AB2 - 205",
+    }
+
+
+def test_get_user_timetable_filters_days_and_fields():
+    monday = agentic_rag.get_user_timetable(days="Mon,Sun", fields="subject")
+
+    assert monday == {
+        "Monday": [
+            {"subject": "Software Engineering"},
+            {"subject": "Advanced Topics in Cryptography & Blockchain"},
+        ],
+        "Sunday": [],
+    }
+    assert "Saturday" not in agentic_rag.get_user_timetable()
+    assert "message" in agentic_rag.get_user_timetable(days="Saturday,Sunday")
+    assert "error" in agentic_rag.get_user_timetable(days="someday")
+    assert "error" in agentic_rag.get_user_timetable(fields="bogus")
+
+
+def test_check_for_conflicts_keeps_event_details(monkeypatch):
+    _freeze_now(monkeypatch, datetime.datetime(2025, 10, 14, 9, 0))  # a Tuesday
+
+    conflicts = agentic_rag.check_for_conflicts()["conflicts"]
+    workshop = next(
+        c
+        for c in conflicts
+        if c["conflicting_event"]["event_name"] == "AI and Robotics Workshop"
+    )
+
+    assert workshop["conflicting_class"]["start_time"] == "10:20"
+    assert workshop["conflicting_event"]["details"].startswith("A full-day workshop")
+
+
+# ===================================================================
+# Chat loop
+# ===================================================================
+def test_run_chat_runs_one_tool_round(monkeypatch):
+    requests = []
+
+    def generate_content(model, contents, config):
+        requests.append(list(contents))
+        if len(requests) == 1:
+            call = types.FunctionCall(
+                name="get_user_timetable", args={"days": "Mon", "fields": "subject"}
+            )
+            return _model_reply(types.Part(function_call=call))
+        return _model_reply(types.Part.from_text(text="You have two classes."))
+
+    monkeypatch.setattr(
+        agentic_rag,
+        "client",
+        SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)),
+    )
+
+    assert agentic_rag._run_chat("Classes on Monday?", "u1") == "You have two classes."
+    assert len(requests) == 2
+
+    tool_turn = requests[1][-1]
+    assert tool_turn.role == "user"
+    response = tool_turn.parts[0].function_response
+    assert response.name == "get_user_timetable"
+    assert list(response.response) == ["Monday"]
+
+
+# ===================================================================
+# Batch processing
+# ===================================================================
+def test_shared_tool_calls_rebucket_clock_tools(monkeypatch):
+    runs = []
+    monkeypatch.setattr(
+        agentic_rag,
+        "_execute_tool_call",
+        lambda fc, user_id: runs.append(fc.name) or fc.name,
+    )
+    minute = ["2025-10-13 09:00"]
+    monkeypatch.setattr(agentic_rag, "_clock_bucket", lambda: minute[0])
+
+    shared = agentic_rag._SharedToolCalls()
+    current = types.FunctionCall(name="get_current_classes", args={})
+    courses = types.FunctionCall(name="get_student_courses", args={})
+
+    for user_id in ("u1", "u2"):
+        shared.run(current, user_id)
+        shared.run(courses, user_id)
+    minute[0] = "2025-10-13 09:01"
+    shared.run(current, "u3")
+    shared.run(courses, "u3")
+
+    assert runs == ["get_current_classes", "get_student_courses", "get_current_classes"]
+    assert shared.hits == 3
+
+
+def test_shared_tool_calls_failure_releases_waiters(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def failing_then_ok(fc, user_id):
+        if not release.is_set():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("boom")
+        return "ok"
+
+    monkeypatch.setattr(agentic_rag, "_execute_tool_call", failing_then_ok)
+    shared = agentic_rag._SharedToolCalls()
+    call = types.FunctionCall(name="get_student_courses", args={})
+    outcomes = {}
+
+    def run(label):
+        try:
+            outcomes[label] = shared.run(call, "u1")
+        except RuntimeError as exc:
+            outcomes[label] = str(exc)
+
+    owner = threading.Thread(target=run, args=("owner",))
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=run, args=("waiter",))
+    waiter.start()
+    deadline = time.monotonic() + 5
+    while shared.hits < 1 and time.monotonic() < deadline:
+        time.sleep(0.001)  # until the waiter is blocked on the owner's Future
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert outcomes == {"owner": "boom", "waiter": "boom"}
+    # The failed result is not kept, so a later call retries.
+    assert shared.run(call, "u1") == "ok"
+
+
+def test_run_batch_uses_process_wide_rate_limiter(monkeypatch):
+    limiters = []
+    monkeypatch.setattr(
+        agentic_rag,
+        "_run_chat",
+        lambda query, user_id, run_tool, limiter: limiters.append(limiter) or "ok",
+    )
+    items = [{"user_id": "u1", "query": "hi"}]
+
+    list(agentic_rag.run_batch(items))
+    list(agentic_rag.run_batch(items))
+    list(agentic_rag.run_batch(items, rate_limit=0))
+
+    assert limiters[0] is limiters[1] is agentic_rag._batch_limiter
+    assert limiters[2] is not agentic_rag._batch_limiter
+
+
+# ===================================================================
+# To-do cache
+# ===================================================================
+class _FakeTodos:
+    """Just enough of a pymongo collection for _load_todos."""
+
+    def __init__(self, docs=(), on_find=None):
+        self.docs = list(docs)
+        self.on_find = on_find
+
+    def find(self, query, projection=None):
+        # Snapshot first: ``on_find`` models a write landing mid-load.
+        matches = [d for d in self.docs if d["userId"] == query["userId"]]
+        if self.on_find is not None:
+            self.on_find()
+        return SimpleNamespace(
+            sort=lambda key, direction: sorted(
+                matches, key=lambda d: d[key], reverse=direction < 0
+            )
+        )
+
+
+def _cache(monkeypatch, collection) -> agentic_rag._TodoCache:
+    monkeypatch.setattr(agentic_rag, "todos_collection", collection)
+    cache = agentic_rag._TodoCache(collection, max_users=10, poll_interval=1)
+    monkeypatch.setattr(cache, "_ensure_watcher", lambda: None)
+    return cache
+
+
+def test_todo_cache_write_through_after_reload_does_not_duplicate(monkeypatch):
+    todos = _FakeTodos()
+    cache = _cache(monkeypatch, todos)
+    assert cache.get("u1") == []
+
+    # insert_one commits, an invalidation drops the list and another
+    # request reloads it before add() runs.
+    todos.docs.append({"_id": 1, "userId": "u1", "title": "T", "createdAt": "1"})
+    cache._invalidate("u1", None)
+    assert cache.get("u1") == ["T"]
+    cache.add("u1", 1, "T")
+
+    assert cache.get("u1") == ["T"]
+
+
+def test_todo_cache_load_survives_other_users_invalidation(monkeypatch):
+    docs = [{"_id": 1, "userId": "u1", "title": "T", "createdAt": "1"}]
+    cache = _cache(monkeypatch, _FakeTodos(docs))
+    agentic_rag.todos_collection.on_find = lambda: cache._invalidate("u2", None)
+
+    cache.get("u1")
+    assert cache.stats()["users_cached"] == 1
+
+
+def test_todo_cache_discards_load_raced_by_same_user(monkeypatch):
+    docs = [{"_id": 1, "userId": "u1", "title": "T", "createdAt": "1"}]
+    cache = _cache(monkeypatch, _FakeTodos(docs))
+    agentic_rag.todos_collection.on_find = lambda: cache._invalidate("u1", None)
+
+    assert cache.get("u1") == ["T"]
+    assert cache.stats()["users_cached"] == 0
+
+
+def test_todo_cache_discards_load_raced_by_unattributed_delete(monkeypatch):
+    todos = _FakeTodos([{"_id": 1, "userId": "u1", "title": "T", "createdAt": "1"}])
+    cache = _cache(monkeypatch, todos)
+
+    def delete_during_load():
+        # The SvelteKit route deletes the todo; the change event only
+        # carries its _id, which the cache hasn't seen yet.
+        todos.on_find = None
+        todos.docs.clear()
+        cache._apply_change({"operationType": "delete", "documentKey": {"_id": 1}})
+
+    todos.on_find = delete_during_load
+
+    assert cache.get("u1") == ["T"]
+    assert cache.stats()["users_cached"] == 0
+    assert cache.get("u1") == []
+
+
+def test_todo_cache_change_event_invalidates_cached_user(monkeypatch):
+    todos = _FakeTodos([{"_id": 1, "userId": "u1", "title": "T", "createdAt": "1"}])
+    cache = _cache(monkeypatch, todos)
+    cache.get("u1")
+
+    todos.docs[0] = dict(todos.docs[0], title="Edited")
+    cache._apply_change({"operationType": "update", "documentKey": {"_id": 1}})
+
+    assert cache.get("u1") == ["Edited"]